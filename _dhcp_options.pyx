@@ -0,0 +1,43 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional C accelerator for DHCP options parsing.
+
+Build in place with:  cythonize -i _dhcp_options.pyx
+dhcp_packet.py falls back to the pure-Python parser when this module
+is not compiled.
+"""
+
+from cpython.bytes cimport PyBytes_FromStringAndSize
+
+
+def parse_options(const unsigned char[:] data):
+    """Parse a DHCP options field (after the magic cookie) into {code: bytes}."""
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t n = data.shape[0]
+    cdef unsigned char code
+    cdef Py_ssize_t length
+    cdef dict result = {}
+
+    while i < n:
+        code = data[i]
+
+        # End option
+        if code == 255:
+            break
+
+        # Pad option
+        if code == 0:
+            i += 1
+            continue
+
+        if i + 1 >= n:
+            break
+
+        length = data[i + 1]
+        if i + 2 + length > n:
+            break
+
+        result[code] = PyBytes_FromStringAndSize(<char*>&data[i + 2], length)
+        i += 2 + length
+
+    return result
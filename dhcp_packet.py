@@ -7,10 +7,39 @@ Handles parsing and building DHCP packets according to RFC 2131.
 import struct
 import socket
 import logging
+from collections.abc import MutableMapping
 from enum import IntEnum
+from functools import lru_cache
+
+try:
+    from _dhcp_options import parse_options as _c_parse_options
+except ImportError:  # Cython accelerator not built; use pure-Python parser
+    _c_parse_options = None
 
 logger = logging.getLogger(__name__)
 
+# Precompiled header layouts (RFC 2131): full 236-byte BOOTP header for
+# parsing, and the fixed-width prefix up to giaddr for building.
+# xid/secs/flags are only echoed back, so they stay raw wire bytes.
+_HDR_FULL = struct.Struct('!BBBB4s2s2s4s4s4s4s16s64s128s')
+_HDR_TX = struct.Struct('!BBBB4s2s2s4s4s4s4s')
+
+ZERO_IP = b'\x00\x00\x00\x00'  # 0.0.0.0, packed
+
+
+# Pools are small and clients recur, so IP string <-> packed conversions
+# are memoized process-wide.
+@lru_cache(maxsize=4096)
+def aton(ip):
+    """Dotted-quad string -> packed 4 bytes."""
+    return socket.inet_aton(ip)
+
+
+@lru_cache(maxsize=4096)
+def ntoa(packed):
+    """Packed 4 bytes -> dotted-quad string."""
+    return socket.inet_ntoa(packed)
+
 
 class DHCPMessageType(IntEnum):
     """DHCP Message Types (RFC 2132, Option 53)"""
@@ -24,13 +53,17 @@ class DHCPMessageType(IntEnum):
     INFORM = 8
 
 
+# Name lookup without constructing an enum member per packet
+_MSG_TYPE_NAME = {int(m): m.name for m in DHCPMessageType}
+
+
 class DHCPOpCode(IntEnum):
     """DHCP Operation Codes"""
     BOOTREQUEST = 1  # Client to server
     BOOTREPLY = 2    # Server to client
 
 
-class DHCPOptions:
+class DHCPOptions(IntEnum):
     """DHCP Option Codes (RFC 2132)"""
     SUBNET_MASK = 1
     ROUTER = 3
@@ -43,6 +76,12 @@ class DHCPOptions:
     END = 255
 
 
+# Plain-int aliases for the per-packet paths (no enum attribute lookup)
+_OPT_REQ_IP = 50
+_OPT_MSG_TYPE = 53
+_OPT_END = 255
+
+
 class DHCPPacket:
     """
     DHCP Packet structure according to RFC 2131.
@@ -77,27 +116,42 @@ class DHCPPacket:
     
     MAGIC_COOKIE = b'\x63\x82\x53\x63'  # 99.130.83.99
     
+    # Packets are created per request/reply; no per-instance __dict__
+    __slots__ = (
+        'op', 'htype', 'hlen', 'hops', 'xid', 'secs', 'flags',
+        'ciaddr', 'yiaddr', 'siaddr', 'giaddr', 'chaddr', 'sname', 'file',
+        'options', '_mac_str',
+    )
+    
     def __init__(self):
         # Header fields
         self.op = 0           # Message op code
         self.htype = 1        # Hardware address type (1 = Ethernet)
         self.hlen = 6         # Hardware address length
         self.hops = 0         # Client sets to zero
-        self.xid = 0          # Transaction ID
-        self.secs = 0         # Seconds elapsed
-        self.flags = 0        # Flags
-        self.ciaddr = '0.0.0.0'  # Client IP address
-        self.yiaddr = '0.0.0.0'  # Your (client) IP address
-        self.siaddr = '0.0.0.0'  # Server IP address
-        self.giaddr = '0.0.0.0'  # Gateway IP address
+        self.xid = b'\x00\x00\x00\x00'  # Transaction ID (raw, network order)
+        self.secs = b'\x00\x00'          # Seconds elapsed (raw)
+        self.flags = b'\x00\x00'         # Flags (raw)
+        # Address fields are kept packed (4 bytes, network order); use the
+        # *_str properties when a dotted-quad is needed.
+        self.ciaddr = ZERO_IP  # Client IP address
+        self.yiaddr = ZERO_IP  # Your (client) IP address
+        self.siaddr = ZERO_IP  # Server IP address
+        self.giaddr = ZERO_IP  # Gateway IP address
         self.chaddr = b''     # Client hardware address
         self.sname = b''      # Server host name
         self.file = b''       # Boot file name
         self.options = {}     # DHCP options
+        self._mac_str = None  # memoized get_client_mac() result
         
     @staticmethod
     def parse(data):
-        """Parse raw DHCP packet data."""
+        """
+        Parse raw DHCP packet data.
+        
+        Accepts any buffer-protocol object (bytes, bytearray, memoryview);
+        the returned packet never references the caller's buffer.
+        """
         if len(data) < 236:
             raise ValueError(f"DHCP packet too short: {len(data)} bytes (minimum 236)")
         
@@ -105,7 +159,7 @@ class DHCPPacket:
         
         try:
             # Unpack fixed-size header (first 236 bytes)
-            header = struct.unpack('!BBBB I HH 4s 4s 4s 4s 16s 64s 128s', data[:236])
+            header = _HDR_FULL.unpack_from(data, 0)
             
             packet.op = header[0]
             packet.htype = header[1]
@@ -114,10 +168,10 @@ class DHCPPacket:
             packet.xid = header[4]
             packet.secs = header[5]
             packet.flags = header[6]
-            packet.ciaddr = socket.inet_ntoa(header[7])
-            packet.yiaddr = socket.inet_ntoa(header[8])
-            packet.siaddr = socket.inet_ntoa(header[9])
-            packet.giaddr = socket.inet_ntoa(header[10])
+            packet.ciaddr = header[7]
+            packet.yiaddr = header[8]
+            packet.siaddr = header[9]
+            packet.giaddr = header[10]
             packet.chaddr = header[11][:packet.hlen]
             packet.sname = header[12]
             packet.file = header[13]
@@ -137,18 +191,16 @@ class DHCPPacket:
                 
                 # Check magic cookie
                 if magic == DHCPPacket.MAGIC_COOKIE:
-                    try:
-                        packet.options = DHCPPacket._parse_options(options_data[4:])
-                    except Exception as e:
-                        logger.warning(f"Failed to parse options: {e}")
-                        packet.options = {}
+                    # Copy the raw field once; individual options are
+                    # decoded on first access.
+                    packet.options = _LazyOptions(bytes(options_data[4:]))
                 else:
-                    logger.warning(f"Invalid DHCP magic cookie")
-                    logger.warning(f"  Expected: {DHCPPacket.MAGIC_COOKIE.hex()}")
-                    logger.warning(f"  Received: {magic.hex()}")
-                    logger.warning(f"  Packet length: {len(data)} bytes")
+                    logger.warning("Invalid DHCP magic cookie")
+                    logger.warning("  Expected: %s", DHCPPacket.MAGIC_COOKIE.hex())
+                    logger.warning("  Received: %s", magic.hex())
+                    logger.warning("  Packet length: %d bytes", len(data))
             else:
-                logger.debug(f"No options data (packet length: {len(data)})")
+                logger.debug("No options data (packet length: %d)", len(data))
         
         return packet
     
@@ -158,11 +210,13 @@ class DHCPPacket:
         options = {}
         i = 0
         
-        while i < len(options_data):
+        n = len(options_data)
+        
+        while i < n:
             option_code = options_data[i]
             
             # End option
-            if option_code == DHCPOptions.END:
+            if option_code == _OPT_END:
                 break
             
             # Pad option
@@ -171,17 +225,17 @@ class DHCPPacket:
                 continue
             
             # Get option length
-            if i + 1 >= len(options_data):
+            if i + 1 >= n:
                 break
                 
             option_length = options_data[i + 1]
             
-            if i + 2 + option_length > len(options_data):
+            if i + 2 + option_length > n:
                 break
             
-            # Extract option data
+            # Extract option data (copied, input may be a reused buffer)
             option_data = options_data[i + 2:i + 2 + option_length]
-            options[option_code] = option_data
+            options[option_code] = bytes(option_data)
             
             i += 2 + option_length
         
@@ -189,9 +243,11 @@ class DHCPPacket:
     
     def build(self):
         """Build DHCP packet as bytes."""
-        # Pack header
-        packet = struct.pack(
-            '!BBBB I HH 4s 4s 4s 4s',
+        # Fixed header + chaddr/sname/file are zero-filled up front, so the
+        # variable-length fields only need to be copied in, not padded.
+        buf = bytearray(236)
+        _HDR_TX.pack_into(
+            buf, 0,
             self.op,
             self.htype,
             self.hlen,
@@ -199,63 +255,156 @@ class DHCPPacket:
             self.xid,
             self.secs,
             self.flags,
-            socket.inet_aton(self.ciaddr),
-            socket.inet_aton(self.yiaddr),
-            socket.inet_aton(self.siaddr),
-            socket.inet_aton(self.giaddr)
+            self.ciaddr,
+            self.yiaddr,
+            self.siaddr,
+            self.giaddr
         )
         
-        # Add chaddr (pad to 16 bytes)
-        chaddr_padded = self.chaddr + (b'\x00' * (16 - len(self.chaddr)))
-        packet += chaddr_padded
-        
-        # Add sname (pad to 64 bytes)
-        sname_padded = self.sname + (b'\x00' * (64 - len(self.sname)))
-        packet += sname_padded
-        
-        # Add file (pad to 128 bytes)
-        file_padded = self.file + (b'\x00' * (128 - len(self.file)))
-        packet += file_padded
+        # chaddr (16), sname (64), file (128)
+        buf[28:28 + len(self.chaddr)] = self.chaddr
+        buf[44:44 + len(self.sname)] = self.sname
+        buf[108:108 + len(self.file)] = self.file
         
         # Add magic cookie
-        packet += self.MAGIC_COOKIE
+        buf.extend(self.MAGIC_COOKIE)
         
         # Add options
         for code, value in self.options.items():
-            packet += bytes([code, len(value)]) + value
+            buf.append(code)
+            buf.append(len(value))
+            buf.extend(value)
         
         # Add end option
-        packet += bytes([DHCPOptions.END])
+        buf.append(_OPT_END)
         
-        return packet
+        return bytes(buf)
     
     def get_message_type(self):
         """Get DHCP message type."""
-        if DHCPOptions.MESSAGE_TYPE in self.options:
-            return self.options[DHCPOptions.MESSAGE_TYPE][0]
-        return None
+        value = self.options.get(_OPT_MSG_TYPE)
+        return value[0] if value else None
     
     def get_client_mac(self):
-        """Get client MAC address as string."""
-        return ':'.join(f'{b:02x}' for b in self.chaddr)
+        """Get client MAC address as string (computed once per packet)."""
+        if self._mac_str is None:
+            self._mac_str = self.chaddr.hex(':')
+        return self._mac_str
     
     def get_requested_ip(self):
-        """Get requested IP address."""
-        if DHCPOptions.REQUESTED_IP in self.options:
-            return socket.inet_ntoa(self.options[DHCPOptions.REQUESTED_IP])
-        return None
+        """Get requested IP address (packed, 4 bytes)."""
+        return self.options.get(_OPT_REQ_IP)
+    
+    @property
+    def ciaddr_str(self):
+        return ntoa(self.ciaddr)
+    
+    @property
+    def yiaddr_str(self):
+        return ntoa(self.yiaddr)
+    
+    @property
+    def siaddr_str(self):
+        return ntoa(self.siaddr)
+    
+    @property
+    def giaddr_str(self):
+        return ntoa(self.giaddr)
     
     def __str__(self):
         """String representation of packet."""
         msg_type = self.get_message_type()
-        msg_type_name = DHCPMessageType(msg_type).name if msg_type else "UNKNOWN"
+        msg_type_name = _MSG_TYPE_NAME.get(msg_type, "UNKNOWN")
         
         return (
             f"DHCP {msg_type_name} Packet\n"
-            f"  Transaction ID: 0x{self.xid:08x}\n"
+            f"  Transaction ID: 0x{self.xid.hex()}\n"
             f"  Client MAC: {self.get_client_mac()}\n"
-            f"  Client IP: {self.ciaddr}\n"
-            f"  Your IP: {self.yiaddr}\n"
-            f"  Server IP: {self.siaddr}\n"
+            f"  Client IP: {self.ciaddr_str}\n"
+            f"  Your IP: {self.yiaddr_str}\n"
+            f"  Server IP: {self.siaddr_str}\n"
             f"  Options: {len(self.options)}"
-        )
\ No newline at end of file
+        )
+
+
+def find_option(raw, code):
+    """
+    Return the value of option `code` in a raw options field, or None.
+    
+    Walks the TLVs without building a dict. A repeated option resolves to
+    its last occurrence, matching a full parse.
+    """
+    value = None
+    i = 0
+    n = len(raw)
+    
+    while i < n:
+        option_code = raw[i]
+        if option_code == _OPT_END:
+            break
+        if option_code == 0:
+            i += 1
+            continue
+        if i + 1 >= n:
+            break
+        end = i + 2 + raw[i + 1]
+        if end > n:
+            break
+        if option_code == code:
+            value = raw[i + 2:end]
+        i = end
+    
+    return value
+
+
+class _LazyOptions(MutableMapping):
+    """
+    Options of a parsed packet. Single-option lookups (get, [], in) scan
+    the raw field on demand; the full dict is only built when the mapping
+    is iterated, sized or modified.
+    """
+    
+    __slots__ = ('_raw', '_found', '_parsed')
+    
+    def __init__(self, raw):
+        self._raw = raw
+        self._found = {}      # code -> value or None, from find_option
+        self._parsed = None   # full dict, once needed
+    
+    def _full(self):
+        if self._parsed is None:
+            if _c_parse_options is not None:
+                self._parsed = _c_parse_options(self._raw)
+            else:
+                self._parsed = DHCPPacket._parse_options(self._raw)
+        return self._parsed
+    
+    def get(self, code, default=None):
+        if self._parsed is not None:
+            return self._parsed.get(code, default)
+        try:
+            value = self._found[code]
+        except KeyError:
+            value = self._found[code] = find_option(self._raw, code)
+        return default if value is None else value
+    
+    def __getitem__(self, code):
+        value = self.get(code)
+        if value is None:
+            raise KeyError(code)
+        return value
+    
+    def __contains__(self, code):
+        return self.get(code) is not None
+    
+    def __setitem__(self, code, value):
+        self._full()[code] = value
+    
+    def __delitem__(self, code):
+        del self._full()[code]
+    
+    def __iter__(self):
+        return iter(self._full())
+    
+    def __len__(self):
+        return len(self._full())
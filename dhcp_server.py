@@ -3,14 +3,23 @@
 Production DHCP Server (updated for multiple-subnet support)
 """
 
+import asyncio
+import signal
 import socket
+import struct
 import json
 import logging
-import struct
 
-from dhcp_packet import DHCPPacket, DHCPMessageType, DHCPOpCode, DHCPOptions
+from dhcp_packet import (DHCPPacket, DHCPMessageType, DHCPOpCode, DHCPOptions,
+                         ZERO_IP, aton, ntoa)
 from ip_manager import IPManager
 from lease_manager import LeaseManager
+import udp_batch
+
+try:
+    import uvloop
+except ImportError:  # optional; falls back to the default asyncio loop
+    uvloop = None
 
 # Configure logging
 logging.basicConfig(
@@ -19,12 +28,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Non-blocking recv flag used to drain bursts (unavailable on Windows)
+_MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', None)
+# Scatter/gather send (unavailable on Windows)
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+_CHADDR_ZERO = bytes(16)
+_BROADCAST_ADDR = ('255.255.255.255', 68)
+_LEASE_STRUCT = struct.Struct('!I')
+# Name lookup without constructing an enum member per packet
+_MSG_TYPE_NAME = {int(m): m.name for m in DHCPMessageType}
+
+
+def _exit_on_sigterm():
+    """Turn SIGTERM into SystemExit so shutdown paths flush pending leases."""
+    def handler(signum, frame):
+        logger.info("Received SIGTERM, shutting down")
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, handler)
+
 
 def load_config(config_file='config.json'):
     with open(config_file, 'r') as f:
         return json.load(f)
 
 
+class DHCPProtocol(asyncio.DatagramProtocol):
+    """asyncio adapter feeding received datagrams to a DHCPServer."""
+
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        try:
+            self.server.handle_request(data, addr)
+        except Exception as e:
+            logger.error(f"Error handling request: {e}", exc_info=True)
+
+    def error_received(self, exc):
+        logger.error(f"Socket error: {exc}")
+
+
 class DHCPServer:
     def __init__(self, config):
         self.config = config
@@ -55,8 +98,56 @@ class DHCPServer:
         )
 
         self.server_socket = None
+        self._transport = None  # set while running under asyncio
+        # Receive buffer reused for every datagram
+        self._recv_buf = bytearray(4096)
+        self._recv_view = memoryview(self._recv_buf)
+        # recvmmsg batch for draining bursts (Linux only)
+        self._recv_batch = udp_batch.RecvBatch() if udp_batch.available() else None
+        # Replies to a drained batch go out in one sendmmsg; set while draining
+        self._send_batch = udp_batch.SendBatch() if udp_batch.available() else None
+        self._out_batch = None
+
+        # Fixed option payloads, packed once at startup
+        self._server_id_bytes = socket.inet_aton(self.server_ip) if self.server_ip else None
+        self._lease_bytes = _LEASE_STRUCT.pack(self.lease_time)
+        self._reply_templates = self._build_reply_templates()
 
     def start(self):
+        if not self._open_socket():
+            return
+        _exit_on_sigterm()
+        self.listen()
+
+    def start_async(self):
+        """Run the server on an asyncio event loop (uvloop when installed)."""
+        if not self._open_socket():
+            return
+        if uvloop is not None and not hasattr(uvloop, 'run'):
+            uvloop.install()  # uvloop < 0.18 has no run(); set the loop policy instead
+        run = getattr(uvloop, 'run', asyncio.run)
+        _exit_on_sigterm()
+        try:
+            run(self._serve_async())
+        except KeyboardInterrupt:
+            logger.info("Shutting down")
+        finally:
+            self.server_socket.close()
+            self.lease_manager.close()
+
+    async def _serve_async(self):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: DHCPProtocol(self), sock=self.server_socket)
+        self._transport = transport
+        logger.info("Waiting for DHCP requests (asyncio)...")
+        try:
+            await loop.create_future()  # run until cancelled
+        finally:
+            self._transport = None
+            transport.close()
+
+    def _open_socket(self):
         logger.info("Starting DHCP Server (multi-subnet enabled)")
         expired = self.lease_manager.cleanup_expired_leases()
         if expired:
@@ -69,21 +160,55 @@ class DHCPServer:
             logger.info("Server listening on port 67")
         except PermissionError:
             logger.error("Permission denied. Run as admin/root to bind to port 67")
-            return
-        self.listen()
+            return False
+        return True
 
     def listen(self):
         logger.info("Waiting for DHCP requests...")
         try:
             while True:
-                data, address = self.server_socket.recvfrom(4096)
-                try:
-                    self.handle_request(data, address)
-                except Exception as e:
-                    logger.error(f"Error handling request: {e}", exc_info=True)
+                nbytes, address = self.server_socket.recvfrom_into(self._recv_buf)
+                self._dispatch(self._recv_view[:nbytes], address)
+                self._drain()
         except KeyboardInterrupt:
             logger.info("Shutting down")
+        finally:
             self.server_socket.close()
+            self.lease_manager.close()
+
+    def _drain(self):
+        """Handle whatever else is already queued before blocking again."""
+        if self._recv_batch is not None:
+            self._out_batch = self._send_batch
+            try:
+                while True:
+                    batch = self._recv_batch.recv(self.server_socket, _MSG_DONTWAIT)
+                    for data, address in batch:
+                        self._dispatch(data, address)
+                    self._flush_replies()
+                    if len(batch) < self._recv_batch.count:
+                        return
+            finally:
+                self._out_batch = None
+        elif _MSG_DONTWAIT is not None:
+            while True:
+                try:
+                    nbytes, address = self.server_socket.recvfrom_into(self._recv_buf, 0, _MSG_DONTWAIT)
+                except BlockingIOError:
+                    return
+                self._dispatch(self._recv_view[:nbytes], address)
+
+    def _flush_replies(self):
+        try:
+            self._out_batch.send(self.server_socket, _BROADCAST_ADDR)
+        except OSError as e:
+            logger.error("Failed to send replies: %s", e)
+
+    def _dispatch(self, data, address):
+        try:
+            self.handle_request(data, address)
+        except Exception as e:
+            logger.error(f"Error handling request: {e}", exc_info=True)
 
     def handle_request(self, data, address):
         packet = DHCPPacket.parse(data)
@@ -91,7 +216,8 @@ class DHCPServer:
         if msg_type is None:
             logger.warning("Packet has no message type")
             return
-        logger.info(f"Message type: {DHCPMessageType(msg_type).name} from {packet.get_client_mac()}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Message type: %s from %s", _MSG_TYPE_NAME.get(msg_type, 'UNKNOWN'), packet.get_client_mac())
         if msg_type == DHCPMessageType.DISCOVER:
             self.handle_discover(packet, address)
         elif msg_type == DHCPMessageType.REQUEST:
@@ -99,43 +225,82 @@ class DHCPServer:
         elif msg_type == DHCPMessageType.RELEASE:
             self.handle_release(packet, address)
         else:
-            logger.warning(f"Unhandled message type: {msg_type}")
+            logger.warning("Unhandled message type: %s", msg_type)
 
     def handle_discover(self, packet, address):
         mac = packet.get_client_mac()
-        requested_ip = packet.get_requested_ip()
-        giaddr = getattr(packet, 'giaddr', None)
+        requested = packet.get_requested_ip()
+        requested_ip = ntoa(requested) if requested else None
+        giaddr = packet.giaddr_str if packet.giaddr != ZERO_IP else None
         allocated_ip, subnet = self.ip_manager.allocate_ip(mac, requested_ip=requested_ip, giaddr=giaddr)
         if not allocated_ip:
             logger.error("No available IP")
             return
-        offer = self.build_offer(packet, allocated_ip, subnet)
-        self.send_packet(offer)
-        logger.info(f"Sent OFFER {allocated_ip} (subnet={subnet.name if subnet else 'unknown'}) to {mac}")
+        self.send_reply(DHCPMessageType.OFFER, packet, allocated_ip, subnet)
+        logger.info("Sent OFFER %s (subnet=%s) to %s", allocated_ip, subnet.name if subnet else 'unknown', mac)
 
     def handle_request_packet(self, packet, address):
         mac = packet.get_client_mac()
         requested_ip = packet.get_requested_ip() or packet.ciaddr
-        giaddr = getattr(packet, 'giaddr', None)
         # Determine which subnet this request is for (if any)
         # ip_manager.get_ip checks reservations and allocations
         allocated_ip = self.ip_manager.get_ip(mac)
-        if allocated_ip and allocated_ip == requested_ip:
+        if allocated_ip and aton(allocated_ip) == requested_ip:
             # determine subnet object for options
             subnet = self.ip_manager._find_subnet_by_requested_ip(allocated_ip)
             self.lease_manager.create_lease(mac, allocated_ip, self.lease_time)
-            ack = self.build_ack(packet, allocated_ip, subnet)
-            self.send_packet(ack)
-            logger.info(f"Sent ACK {allocated_ip} to {mac}")
+            self.send_reply(DHCPMessageType.ACK, packet, allocated_ip, subnet)
+            logger.info("Sent ACK %s to %s", allocated_ip, mac)
         else:
-            logger.warning(f"Cannot provide requested IP {requested_ip} to {mac}")
+            logger.warning("Cannot provide requested IP %s to %s", ntoa(requested_ip), mac)
             # TODO: implement NAK
 
     def handle_release(self, packet, address):
         mac = packet.get_client_mac()
         self.lease_manager.release_lease(mac)
         self.ip_manager.release_ip(mac)
-        logger.info(f"Released IP for {mac}")
+        logger.info("Released IP for %s", mac)
+
+    def _build_reply_templates(self):
+        """
+        Serialize OFFER/ACK once per subnet; only per-client fields vary.
+        Each template is split into a mutable 236-byte header, patched in
+        place per reply, and the constant magic cookie + options tail.
+        """
+        dummy = DHCPPacket()
+        templates = {}
+        for subnet in self.ip_manager.subnets:
+            if not subnet.gateway and self._server_id_bytes is None:
+                continue  # no server identifier to advertise
+            for msg_type, builder in ((DHCPMessageType.OFFER, self.build_offer),
+                                      (DHCPMessageType.ACK, self.build_ack)):
+                data = builder(dummy, '0.0.0.0', subnet).build()
+                templates[subnet, msg_type] = (bytearray(data[:236]), data[236:])
+        return templates
+
+    def send_reply(self, msg_type, request_packet, ip, subnet):
+        """
+        Send an OFFER/ACK by patching htype/hlen, xid, flags, yiaddr and
+        chaddr into the subnet's template header; everything else (op, hops,
+        secs, siaddr, options tail) is already serialized. Falls back to a
+        full DHCPPacket build when there is no template (e.g. a global
+        reservation outside every configured subnet).
+        """
+        template = self._reply_templates.get((subnet, msg_type))
+        if template is None:
+            builder = self.build_offer if msg_type == DHCPMessageType.OFFER else self.build_ack
+            self.send_packet(builder(request_packet, ip, subnet).build())
+            return
+        buf, tail = template
+        chaddr = request_packet.chaddr
+        buf[1] = request_packet.htype
+        buf[2] = request_packet.hlen
+        buf[4:8] = request_packet.xid
+        buf[10:12] = request_packet.flags
+        buf[16:20] = aton(ip)
+        buf[28:44] = _CHADDR_ZERO
+        buf[28:28 + len(chaddr)] = chaddr
+        self.send_packet(buf, tail)
 
     def build_offer(self, request_packet, offered_ip, subnet):
         offer = DHCPPacket()
@@ -144,21 +309,20 @@ class DHCPServer:
         offer.hlen = request_packet.hlen
         offer.xid = request_packet.xid
         offer.flags = request_packet.flags
-        offer.yiaddr = offered_ip
-        offer.siaddr = (subnet.gateway if subnet and subnet.gateway else self.server_ip)
+        offer.yiaddr = aton(offered_ip)
+        offer.siaddr = (subnet.gateway_bytes if subnet and subnet.gateway else self._server_id_bytes)
         offer.chaddr = request_packet.chaddr
 
         offer.options[DHCPOptions.MESSAGE_TYPE] = bytes([DHCPMessageType.OFFER])
-        offer.options[DHCPOptions.SERVER_ID] = socket.inet_aton(offer.siaddr)
-        offer.options[DHCPOptions.LEASE_TIME] = struct.pack('!I', self.lease_time)
+        offer.options[DHCPOptions.SERVER_ID] = offer.siaddr
+        offer.options[DHCPOptions.LEASE_TIME] = self._lease_bytes
         # subnet-specific options
         if subnet:
-            offer.options[DHCPOptions.SUBNET_MASK] = socket.inet_aton(subnet.subnet_mask)
+            offer.options[DHCPOptions.SUBNET_MASK] = subnet.subnet_mask_bytes
             if subnet.gateway:
-                offer.options[DHCPOptions.ROUTER] = socket.inet_aton(subnet.gateway)
+                offer.options[DHCPOptions.ROUTER] = subnet.gateway_bytes
             if subnet.dns_servers:
-                dns_bytes = b''.join(socket.inet_aton(d) for d in subnet.dns_servers)
-                offer.options[DHCPOptions.DNS_SERVER] = dns_bytes
+                offer.options[DHCPOptions.DNS_SERVER] = subnet.dns_bytes
         return offer
 
     def build_ack(self, request_packet, assigned_ip, subnet):
@@ -168,23 +332,37 @@ class DHCPServer:
         ack.hlen = request_packet.hlen
         ack.xid = request_packet.xid
         ack.flags = request_packet.flags
-        ack.yiaddr = assigned_ip
-        ack.siaddr = (subnet.gateway if subnet and subnet.gateway else self.server_ip)
+        ack.yiaddr = aton(assigned_ip)
+        ack.siaddr = (subnet.gateway_bytes if subnet and subnet.gateway else self._server_id_bytes)
         ack.chaddr = request_packet.chaddr
 
         ack.options[DHCPOptions.MESSAGE_TYPE] = bytes([DHCPMessageType.ACK])
-        ack.options[DHCPOptions.SERVER_ID] = socket.inet_aton(ack.siaddr)
-        ack.options[DHCPOptions.LEASE_TIME] = struct.pack('!I', self.lease_time)
+        ack.options[DHCPOptions.SERVER_ID] = ack.siaddr
+        ack.options[DHCPOptions.LEASE_TIME] = self._lease_bytes
         if subnet:
-            ack.options[DHCPOptions.SUBNET_MASK] = socket.inet_aton(subnet.subnet_mask)
+            ack.options[DHCPOptions.SUBNET_MASK] = subnet.subnet_mask_bytes
             if subnet.gateway:
-                ack.options[DHCPOptions.ROUTER] = socket.inet_aton(subnet.gateway)
+                ack.options[DHCPOptions.ROUTER] = subnet.gateway_bytes
             if subnet.dns_servers:
-                dns_bytes = b''.join(socket.inet_aton(d) for d in subnet.dns_servers)
-                ack.options[DHCPOptions.DNS_SERVER] = dns_bytes
+                ack.options[DHCPOptions.DNS_SERVER] = subnet.dns_bytes
         return ack
 
-    def send_packet(self, packet):
-        data = packet.build()
-        broadcast_address = ('255.255.255.255', 68)
-        self.server_socket.sendto(data, broadcast_address)
\ No newline at end of file
+    def send_packet(self, data, tail=b''):
+        """
+        Broadcast a reply. `data` may be a reused buffer: it is gathered
+        with `tail` straight from memory via sendmsg, and only copied when
+        the transport may hold on to it (asyncio), sendmsg is missing, or
+        the reply is queued for a batched send while draining.
+        """
+        batch = self._out_batch
+        if batch is not None:
+            if batch.full():
+                self._flush_replies()
+            if batch.add(data, tail):
+                return
+        if self._transport is not None:
+            self._transport.sendto(bytes(data) + tail, _BROADCAST_ADDR)
+        elif _HAS_SENDMSG:
+            self.server_socket.sendmsg([data, tail], (), 0, _BROADCAST_ADDR)
+        else:
+            self.server_socket.sendto(bytes(data) + tail, _BROADCAST_ADDR)
\ No newline at end of file
@@ -11,10 +11,66 @@ Responsibilities:
 
 import ipaddress
 import logging
+from bisect import bisect_right
+import socket
+import string
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
 
+# Per-address state in Subnet._flags (0 = free)
+_RESERVED = 1
+_ALLOCATED = 2
+
+
+# '-' and '.' separators -> ':', upper -> lower case, in one pass
+_MAC_TRANS = str.maketrans('-.' + string.ascii_uppercase, '::' + string.ascii_lowercase)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_mac(mac):
+    """Canonical lower-case colon form; cached since client MACs recur."""
+    return mac.translate(_MAC_TRANS)
+
+
+@lru_cache(maxsize=4096)
+def _mac_key(mac):
+    """
+    Raw hardware-address bytes used as the internal dict key for a MAC
+    string. Only the colon-separated octet form (what normalization
+    yields for ':' or '-' separated input, and what clients send) becomes
+    bytes; anything else, e.g. 'aabb.ccdd.eeff' or 'aabbccddeeff', keeps
+    its normalized string form, so matching is the same as comparing
+    normalized strings.
+    """
+    norm = _normalize_mac(mac)
+    parts = norm.split(':')
+    if all(len(p) == 2 and p.isalnum() for p in parts):
+        try:
+            return bytes.fromhex(''.join(parts))
+        except ValueError:
+            pass
+    return norm
+
+
+@lru_cache(maxsize=4096)
+def _ip_to_int(ip):
+    """Canonical dotted-quad -> int; None for anything else."""
+    try:
+        packed = socket.inet_aton(ip)
+    except (OSError, TypeError, ValueError):
+        return None
+    if socket.inet_ntoa(packed) != ip:
+        return None
+    return int.from_bytes(packed, 'big')
+
+
+@lru_cache(maxsize=4096)
+def _int_to_ip(value):
+    return socket.inet_ntoa(value.to_bytes(4, 'big'))
+
+
 class Subnet:
     def __init__(self, name, network_cidr, pool_start, pool_end,
                  subnet_mask=None, gateway=None, dns_servers=None, reservations=None):
@@ -23,24 +79,36 @@ class Subnet:
         self.subnet_mask = subnet_mask or str(self.network.netmask)
         self.gateway = gateway
         self.dns_servers = dns_servers or []
-        self.reservations = {self._normalize_mac(mac): ip for mac, ip in (reservations or {}).items()}
-        # Build pool set of strings
-        start = ipaddress.IPv4Address(pool_start)
-        end = ipaddress.IPv4Address(pool_end)
-        self.pool = set()
-        cur = start
-        while cur <= end:
-            self.pool.add(str(cur))
-            cur += 1
-        # allocated: mac -> ip
+        # Packed option payloads, computed once instead of per reply
+        self.subnet_mask_bytes = socket.inet_aton(self.subnet_mask)
+        self.gateway_bytes = socket.inet_aton(gateway) if gateway else None
+        self.dns_bytes = b''.join(socket.inet_aton(d) for d in self.dns_servers)
+        # MACs are keyed as raw bytes, allocated IPs stored as ints; the
+        # public methods take and return strings.
+        self.reservations = {_mac_key(mac): ip for mac, ip in (reservations or {}).items()}
+        # Pool is the integer range [pool_base, pool_base + pool_size) with
+        # one state byte per address; strings are only made at the API edge.
+        self.pool_base = int(ipaddress.IPv4Address(pool_start))
+        self.pool_size = max(0, int(ipaddress.IPv4Address(pool_end)) - self.pool_base + 1)
+        self._flags = bytearray(self.pool_size)
+        for ip in self.reservations.values():
+            idx = self._pool_offset(ip)
+            if idx is not None:
+                self._flags[idx] |= _RESERVED
+        # allocated: mac key -> int IP (None for an unparsable reserved IP)
         self.allocated = {}
+        # Every pool offset before this one is known to be reserved or allocated
+        self._first_free = 0
 
-    def _normalize_mac(self, mac):
-        mac = mac.replace('-', ':').replace('.', ':').lower()
-        parts = mac.split(':')
-        if len(parts) == 6:
-            return ':'.join(parts)
-        return mac
+    def _pool_offset(self, ip):
+        """Offset of `ip` within the pool, or None if it is not a pool address."""
+        value = _ip_to_int(ip)
+        if value is None:
+            return None
+        idx = value - self.pool_base
+        if 0 <= idx < self.pool_size:
+            return idx
+        return None
 
     def has_ip(self, ip):
         try:
@@ -49,56 +117,72 @@ class Subnet:
             return False
 
     def is_ip_available(self, ip):
-        if ip in self.reservations.values():
-            return False
-        return ip in self.pool and ip not in self.allocated.values()
+        idx = self._pool_offset(ip)
+        return idx is not None and not self._flags[idx]
 
     def allocate_for_mac(self, mac, requested_ip=None):
-        mac = self._normalize_mac(mac)
+        key = _mac_key(mac)
+        mac = _normalize_mac(mac)
         # Reservation for this MAC in this subnet?
-        if mac in self.reservations:
-            reserved_ip = self.reservations[mac]
-            self.allocated[mac] = reserved_ip
-            logger.info(f"[{self.name}] MAC {mac} using reserved IP {reserved_ip}")
+        if key in self.reservations:
+            reserved_ip = self.reservations[key]
+            self.allocated[key] = _ip_to_int(reserved_ip)
+            logger.info("[%s] MAC %s using reserved IP %s", self.name, mac, reserved_ip)
             return reserved_ip
 
         # Already allocated?
-        if mac in self.allocated:
-            return self.allocated[mac]
+        if key in self.allocated:
+            return _int_to_ip(self.allocated[key])
 
         # Honor requested IP if available and belongs to this subnet pool
-        if requested_ip and requested_ip in self.pool:
-            if requested_ip not in self.reservations.values() and requested_ip not in self.allocated.values():
-                self.allocated[mac] = requested_ip
-                logger.info(f"[{self.name}] Allocated requested IP {requested_ip} to {mac}")
+        idx = self._pool_offset(requested_ip) if requested_ip else None
+        if idx is not None:
+            if not self._flags[idx]:
+                self._flags[idx] = _ALLOCATED
+                self.allocated[key] = self.pool_base + idx
+                logger.info("[%s] Allocated requested IP %s to %s", self.name, requested_ip, mac)
                 return requested_ip
             else:
-                logger.debug(f"[{self.name}] Requested IP {requested_ip} not available")
-
-        # Allocate first available
-        reserved_ips = set(self.reservations.values())
-        for ip in sorted(self.pool, key=lambda x: tuple(int(p) for p in x.split('.'))):
-            if ip not in reserved_ips and ip not in self.allocated.values():
-                self.allocated[mac] = ip
-                logger.info(f"[{self.name}] Allocated IP {ip} to {mac}")
-                return ip
+                logger.debug("[%s] Requested IP %s not available", self.name, requested_ip)
+
+        # Allocate first available: C-level scan for a free byte from the cursor
+        idx = self._flags.find(0, self._first_free)
+        if idx >= 0:
+            self._first_free = idx
+            self._flags[idx] = _ALLOCATED
+            self.allocated[key] = self.pool_base + idx
+            ip = _int_to_ip(self.pool_base + idx)
+            logger.info("[%s] Allocated IP %s to %s", self.name, ip, mac)
+            return ip
+        self._first_free = self.pool_size
 
-        logger.warning(f"[{self.name}] No available IPs")
+        logger.warning("[%s] No available IPs", self.name)
         return None
 
     def release(self, mac):
-        mac = self._normalize_mac(mac)
-        if mac in self.allocated:
-            ip = self.allocated.pop(mac)
-            logger.info(f"[{self.name}] Released IP {ip} for {mac}")
+        key = _mac_key(mac)
+        if key in self.allocated:
+            value = self.allocated.pop(key)
+            idx = value - self.pool_base if value is not None else -1
+            if 0 <= idx < self.pool_size:
+                self._flags[idx] &= ~_ALLOCATED
+                # Rewind the cursor so the freed address is found again
+                if idx < self._first_free:
+                    self._first_free = idx
+            if key in self.reservations:
+                ip = self.reservations[key]
+            else:
+                ip = _int_to_ip(value)
+            logger.info("[%s] Released IP %s for %s", self.name, ip, _normalize_mac(mac))
             return True
         return False
 
     def get_ip_for_mac(self, mac):
-        mac = self._normalize_mac(mac)
-        if mac in self.reservations:
-            return self.reservations[mac]
-        return self.allocated.get(mac)
+        key = _mac_key(mac)
+        if key in self.reservations:
+            return self.reservations[key]
+        value = self.allocated.get(key)
+        return _int_to_ip(value) if value is not None else None
 
 
 class IPManager:
@@ -110,7 +194,7 @@ class IPManager:
         global_reservations: optional dict of mac->ip for backward compatibility
         """
         self.subnets = []
-        self.global_reservations = {self._normalize_mac(k): v for k, v in (global_reservations or {}).items()}
+        self.global_reservations = {_mac_key(k): v for k, v in (global_reservations or {}).items()}
         if subnet_configs:
             for s in subnet_configs:
                 name = s.get('name') or f"{s.get('ip_pool_start')}-{s.get('ip_pool_end')}"
@@ -126,33 +210,64 @@ class IPManager:
                 )
                 # exclude reserved IPs from dynamic pool if they overlap (info only)
                 self.subnets.append(subnet)
-        logger.info(f"Initialized IPManager with {len(self.subnets)} subnet(s)")
+        self._build_subnet_index()
+        # Pool and reservation sizes are fixed after init
+        self._pool_total = sum(s.pool_size for s in self.subnets)
+        self._reserved_total = sum(len(s.reservations) for s in self.subnets) + len(self.global_reservations)
+        logger.info("Initialized IPManager with %d subnet(s)", len(self.subnets))
 
-    def _normalize_mac(self, mac):
-        mac = mac.replace('-', ':').replace('.', ':').lower()
-        parts = mac.split(':')
-        if len(parts) == 6:
-            return ':'.join(parts)
-        return mac
+    def _build_subnet_index(self):
+        """
+        Flatten subnet networks into sorted, disjoint [low, high] ranges, each
+        owned by the first subnet (config order) covering it, so a lookup is
+        one bisect. Ranges and gateways map to (config order, subnet).
+        """
+        spans = [(int(s.network.network_address), int(s.network.broadcast_address))
+                 for s in self.subnets]
+        bounds = sorted({b for low, high in spans for b in (low, high + 1)})
+        ranges = []
+        for low, next_low in zip(bounds, bounds[1:]):
+            owner = next(((order, self.subnets[order]) for order, (s_low, s_high) in enumerate(spans)
+                          if s_low <= low <= s_high), None)
+            if owner is None:
+                continue
+            if ranges and ranges[-1][2][0] == owner[0] and ranges[-1][1] == low - 1:
+                ranges[-1][1] = next_low - 1
+            else:
+                ranges.append([low, next_low - 1, owner])
+        self._subnet_ranges = ranges
+        self._range_starts = [r[0] for r in ranges]
+        self._gateway_owner = {}
+        for order, subnet in enumerate(self.subnets):
+            if subnet.gateway:
+                self._gateway_owner.setdefault(subnet.gateway, (order, subnet))
+
+    def _lookup_network(self, ip):
+        """(config order, subnet) of the first subnet whose network holds ip."""
+        value = _ip_to_int(ip)
+        if value is None:
+            return None
+        i = bisect_right(self._range_starts, value) - 1
+        if i >= 0 and value <= self._subnet_ranges[i][1]:
+            return self._subnet_ranges[i][2]
+        return None
 
     def _find_subnet_by_giaddr(self, giaddr):
         if not giaddr:
             return None
-        for subnet in self.subnets:
-            # Check if giaddr is the gateway or inside the subnet network
-            if subnet.gateway and giaddr == subnet.gateway:
-                return subnet
-            if subnet.has_ip(giaddr):
-                return subnet
-        return None
+        # giaddr may be a subnet's gateway or inside its network; the
+        # earliest configured subnet matching either way wins
+        by_gateway = self._gateway_owner.get(giaddr)
+        by_network = self._lookup_network(giaddr)
+        if by_gateway and (not by_network or by_gateway[0] <= by_network[0]):
+            return by_gateway[1]
+        return by_network[1] if by_network else None
 
     def _find_subnet_by_requested_ip(self, requested_ip):
         if not requested_ip:
             return None
-        for subnet in self.subnets:
-            if subnet.has_ip(requested_ip):
-                return subnet
-        return None
+        owner = self._lookup_network(requested_ip)
+        return owner[1] if owner else None
 
     def allocate_ip(self, mac, requested_ip=None, giaddr=None):
         """
@@ -163,11 +278,11 @@ class IPManager:
           3) subnet selection by requested_ip
           4) fallback to first subnet with available IP
         """
-        mac_norm = self._normalize_mac(mac)
+        key = _mac_key(mac)
 
         # Global reservation check
-        if mac_norm in self.global_reservations:
-            ip = self.global_reservations[mac_norm]
+        if key in self.global_reservations:
+            ip = self.global_reservations[key]
             # find subnet that owns this IP
             subnet = self._find_subnet_by_requested_ip(ip)
             # If not found, just return ip with None subnet (outside configured subnets)
@@ -194,10 +309,10 @@ class IPManager:
         return None, None
 
     def get_ip(self, mac):
-        mac_norm = self._normalize_mac(mac)
+        key = _mac_key(mac)
         # check global reservations
-        if mac_norm in self.global_reservations:
-            return self.global_reservations[mac_norm]
+        if key in self.global_reservations:
+            return self.global_reservations[key]
         # check per-subnet allocations/reservations
         for subnet in self.subnets:
             ip = subnet.get_ip_for_mac(mac)
@@ -206,19 +321,15 @@ class IPManager:
         return None
 
     def release_ip(self, mac):
-        mac_norm = self._normalize_mac(mac)
         for subnet in self.subnets:
             if subnet.release(mac):
                 return True
         return False
 
     def get_stats(self):
-        total = sum(len(s.pool) for s in self.subnets)
-        allocated = sum(len(s.allocated) for s in self.subnets)
-        reserved = sum(len(s.reservations) for s in self.subnets) + len(self.global_reservations)
         return {
-            'total': total,
-            'allocated': allocated,
-            'reserved': reserved,
+            'total': self._pool_total,
+            'allocated': sum(len(s.allocated) for s in self.subnets),
+            'reserved': self._reserved_total,
             'subnets': [{ 'name': s.name, 'network': str(s.network), 'allocated': len(s.allocated), 'reserved': len(s.reservations) } for s in self.subnets]
         }
\ No newline at end of file
@@ -4,53 +4,148 @@ DHCP Lease Manager
 Handles lease tracking, persistence, and expiration.
 """
 
+import heapq
 import json
 import logging
-from datetime import datetime, timedelta
+import os
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib json module
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+def _loads(raw):
+    """Decode the lease file contents (bytes)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _public(lease):
+    """Persisted/returned form of a lease: ISO times, no in-memory fields."""
+    return {
+        'ip_address': lease['ip_address'],
+        'start_time': datetime.fromtimestamp(lease['_start_ts']).isoformat(),
+        'expires_at': datetime.fromtimestamp(lease['_expires_ts']).isoformat(),
+        'lease_time': lease['lease_time'],
+    }
+
+
+def _dumps(data, pretty=False):
+    """Encode leases to bytes; compact unless `pretty`."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(data, indent=2 if pretty else None).encode()
+
+
 class LeaseManager:
     """Manages DHCP leases with persistence."""
     
-    def __init__(self, lease_file='leases.json', default_lease_time=86400):
+    def __init__(self, lease_file='leases.json', default_lease_time=86400, flush_interval=5.0,
+                 pretty=False):
         """
         Initialize lease manager.
         
         Args:
             lease_file (str): Path to lease database file
             default_lease_time (int): Default lease time in seconds (default: 24h)
+            flush_interval (float): Seconds between background writes of
+                pending changes; 0 writes on every change (default: 5s)
+            pretty (bool): Indent the lease file for debugging (default: compact)
         """
         self.lease_file = Path(lease_file)
         self.default_lease_time = default_lease_time
+        self.flush_interval = flush_interval
+        self.pretty = pretty
         self.leases = {}  # MAC -> lease info
+        self._expiry_heap = []  # (expires_ts, MAC); stale entries skipped lazily
+        
+        self._dirty = False
+        self._lock = threading.Lock()  # guards leases against the flusher
+        self._write_lock = threading.Lock()  # one writer of the lease file at a time
+        self._stop = threading.Event()
+        self._flusher = None
         
         self.load_leases()
+        
+        if flush_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='lease-flush', daemon=True)
+            self._flusher.start()
     
     def load_leases(self):
         """Load leases from disk."""
         if self.lease_file.exists():
             try:
-                with open(self.lease_file, 'r') as f:
-                    self.leases = json.load(f)
-                logger.info(f"Loaded {len(self.leases)} leases from {self.lease_file}")
+                with open(self.lease_file, 'rb') as f:
+                    self.leases = _loads(f.read())
+                # Held in memory as epoch seconds; the ISO strings are only
+                # the on-disk form
+                for lease in self.leases.values():
+                    lease['_start_ts'] = datetime.fromisoformat(lease.pop('start_time')).timestamp()
+                    lease['_expires_ts'] = datetime.fromisoformat(lease.pop('expires_at')).timestamp()
+                self._rebuild_expiry_heap()
+                logger.info("Loaded %d leases from %s", len(self.leases), self.lease_file)
             except Exception as e:
-                logger.error(f"Failed to load leases: {e}")
+                logger.error("Failed to load leases: %s", e)
                 self.leases = {}
         else:
             logger.info("No existing lease file found, starting fresh")
             self.leases = {}
     
     def save_leases(self):
-        """Save leases to disk."""
-        try:
-            with open(self.lease_file, 'w') as f:
-                json.dump(self.leases, f, indent=2)
-            logger.debug(f"Saved {len(self.leases)} leases to {self.lease_file}")
-        except Exception as e:
-            logger.error(f"Failed to save leases: {e}")
+        """Save leases to disk (temp file + atomic rename)."""
+        tmp_file = self.lease_file.with_suffix('.tmp')
+        with self._write_lock:
+            # Only the snapshot is taken under the packet-path lock; lease
+            # dicts are replaced, never mutated, so a shallow copy is enough.
+            with self._lock:
+                snapshot = list(self.leases.items())
+                self._dirty = False
+            try:
+                data = {mac: _public(lease) for mac, lease in snapshot}
+                with open(tmp_file, 'wb') as f:
+                    f.write(_dumps(data, self.pretty))
+                os.replace(tmp_file, self.lease_file)
+                logger.debug("Saved %d leases to %s", len(data), self.lease_file)
+            except Exception as e:
+                self._dirty = True  # retry on the next flush
+                logger.error("Failed to save leases: %s", e)
+    
+    def flush(self):
+        """Write pending changes to disk, if there are any."""
+        if self._dirty:
+            self.save_leases()
+    
+    def close(self):
+        """Stop the background flusher and write pending changes."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+    
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def _rebuild_expiry_heap(self):
+        self._expiry_heap = [(lease['_expires_ts'], mac) for mac, lease in self.leases.items()]
+        heapq.heapify(self._expiry_heap)
+    
+    def _changed(self):
+        """Record a mutation; written by the flusher, or now if there is none."""
+        if self._flusher is not None:
+            self._dirty = True
+        else:
+            self.save_leases()
     
     def create_lease(self, mac_address, ip_address, lease_time=None):
         """
@@ -64,18 +159,26 @@ class LeaseManager:
         if lease_time is None:
             lease_time = self.default_lease_time
         
-        now = datetime.now()
-        expires_at = now + timedelta(seconds=lease_time)
+        now_ts = time.time()
+        expires_ts = now_ts + lease_time
         
-        self.leases[mac_address] = {
-            'ip_address': ip_address,
-            'start_time': now.isoformat(),
-            'expires_at': expires_at.isoformat(),
-            'lease_time': lease_time
-        }
+        # ISO start_time/expires_at are only produced when saved or read back
+        with self._lock:
+            self.leases[mac_address] = {
+                'ip_address': ip_address,
+                'lease_time': lease_time,
+                '_start_ts': now_ts,
+                '_expires_ts': expires_ts
+            }
         
-        self.save_leases()
-        logger.info(f"Created lease: {mac_address} -> {ip_address} (expires: {expires_at})")
+        # Renewals leave stale entries behind; compact once they dominate
+        if len(self._expiry_heap) > 2 * len(self.leases) + 64:
+            self._rebuild_expiry_heap()
+        else:
+            heapq.heappush(self._expiry_heap, (expires_ts, mac_address))
+        
+        self._changed()
+        logger.info("Created lease: %s -> %s (lease: %ss)", mac_address, ip_address, lease_time)
     
     def get_lease(self, mac_address):
         """
@@ -87,7 +190,8 @@ class LeaseManager:
         Returns:
             dict: Lease info or None if not found
         """
-        return self.leases.get(mac_address)
+        lease = self.leases.get(mac_address)
+        return _public(lease) if lease is not None else None
     
     def release_lease(self, mac_address):
         """
@@ -100,55 +204,55 @@ class LeaseManager:
             bool: True if released, False if not found
         """
         if mac_address in self.leases:
-            released = self.leases.pop(mac_address)
-            self.save_leases()
-            logger.info(f"Released lease for {mac_address} ({released['ip_address']})")
+            with self._lock:
+                released = self.leases.pop(mac_address)
+            self._changed()
+            logger.info("Released lease for %s (%s)", mac_address, released['ip_address'])
             return True
         
         return False
     
     def is_lease_valid(self, mac_address):
         """Check if a lease is still valid (not expired)."""
-        lease = self.get_lease(mac_address)
+        lease = self.leases.get(mac_address)
         if not lease:
             return False
         
-        expires_at = datetime.fromisoformat(lease['expires_at'])
-        return datetime.now() < expires_at
+        return time.time() < lease['_expires_ts']
     
     def cleanup_expired_leases(self):
         """Remove expired leases."""
-        now = datetime.now()
+        now_ts = time.time()
         expired = []
+        heap = self._expiry_heap
         
-        for mac, lease in self.leases.items():
-            expires_at = datetime.fromisoformat(lease['expires_at'])
-            if now >= expires_at:
-                expired.append(mac)
-        
+        # Pop only what is due; an entry whose timestamp no longer matches
+        # the lease (renewed or released) is stale and dropped. Leases are
+        # removed as they match, so a duplicate entry finds nothing.
+        with self._lock:
+            while heap and heap[0][0] <= now_ts:
+                expires_ts, mac = heapq.heappop(heap)
+                lease = self.leases.get(mac)
+                if lease is not None and lease['_expires_ts'] == expires_ts:
+                    del self.leases[mac]
+                    expired.append(mac)
         for mac in expired:
-            self.leases.pop(mac)
-            logger.info(f"Removed expired lease for {mac}")
+            logger.info("Removed expired lease for %s", mac)
         
         if expired:
-            self.save_leases()
+            self._changed()
         
         return len(expired)
     
     def get_all_leases(self):
         """Get all active leases."""
-        return self.leases.copy()
+        return {mac: _public(lease) for mac, lease in self.leases.items()}
     
     def get_stats(self):
         """Get lease statistics."""
         total = len(self.leases)
-        expired = 0
-        now = datetime.now()
-        
-        for lease in self.leases.values():
-            expires_at = datetime.fromisoformat(lease['expires_at'])
-            if now >= expires_at:
-                expired += 1
+        now_ts = time.time()
+        expired = sum(1 for lease in self.leases.values() if now_ts >= lease['_expires_ts'])
         
         return {
             'total': total,
@@ -1,55 +1,191 @@
 #!/usr/bin/env python3
+import argparse
+import selectors
 import socket
+import struct
+import sys
+import time
 
-def send_discover():
-    packet = b'\x01'
-    packet += b'\x01\x06\x00'
-    packet += b'\x12\x34\x56\x78'
-    packet += b'\x00' * 24
-    packet += b'\xaa\xbb\xcc\xdd\xee\xff' + b'\x00' * 10
-    packet += b'\x00' * 192
-    packet += b'\x63\x82\x53\x63'
-    packet += b'\x35\x01\x01'
-    packet += b'\xff'
+import udp_batch
+
+_XID = struct.Struct('!I')
+_SOCK_NONBLOCK = getattr(socket, 'SOCK_NONBLOCK', 0)  # Linux only
+_BROADCAST_ADDR = ('255.255.255.255', 67)
+_MAX_BATCH = 100  # DISCOVERs per sendmmsg call
+_CHADDR_OFFSET = 28  # chaddr field in the BOOTP header
+
+# DISCOVER from aa:bb:cc:dd:ee:ff, xid 0x12345678, built once at import;
+# bursts patch xid/chaddr in a single bytearray copy
+_DISCOVER_TEMPLATE = (
+    b'\x01\x01\x06\x00'                           # op, htype, hlen, hops
+    + b'\x12\x34\x56\x78'                         # xid
+    + b'\x00' * 20                                # secs, flags, ciaddr .. giaddr
+    + b'\xaa\xbb\xcc\xdd\xee\xff' + b'\x00' * 10  # chaddr
+    + b'\x00' * 192                               # sname, file
+    + b'\x63\x82\x53\x63'                         # magic cookie
+    + b'\x35\x01\x01'                             # option 53: DISCOVER
+    + b'\xff'                                     # end
+)
+
+_RCVBUF = 10 * 1024 * 1024
+_SNDBUF = 1 * 1024 * 1024
+# Linux reports double the requested size (bookkeeping overhead)
+_BUF_REPORT_FACTOR = 2 if sys.platform.startswith('linux') else 1
+
+
+def _set_buffers(sock, rcvbuf, sndbuf):
+    """
+    Enlarge the socket buffers so bursts are not dropped. The kernel
+    silently clamps the sizes, so report what was actually granted.
+    Returns True if either size was clamped.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+    got_rcv = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    got_snd = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+    print(f"  Socket buffers: rcv={got_rcv} snd={got_snd} bytes")
+    return (got_rcv < rcvbuf * _BUF_REPORT_FACTOR
+            or got_snd < sndbuf * _BUF_REPORT_FACTOR)
+
+
+def _print_buffer_hint(rcvbuf, sndbuf):
+    print("  Socket buffers clamped by the kernel; raise the limits with:")
+    print(f"    sysctl -w net.core.rmem_max={rcvbuf} net.core.wmem_max={sndbuf}")
+
+
+def _send_burst(sock, packet, count):
+    """
+    Send `count` copies of `packet` on connected `sock`, each with its own
+    xid and client MAC (both counting up from the template's), batched
+    via sendmmsg on Linux.
+    """
+    buf = bytearray(packet)
+    xid = _XID.unpack_from(buf, 4)[0]
+    # Only the low three MAC octets vary (chaddr bytes 3..5)
+    mac_lo = _CHADDR_OFFSET + 3
+    mac_low = int.from_bytes(buf[mac_lo:mac_lo + 3], 'big')
+    batch = (udp_batch.SendBatch(min(count, _MAX_BATCH), len(buf), connected=True)
+             if udp_batch.available() else None)
+    
+    for i in range(count):
+        _XID.pack_into(buf, 4, (xid + i) & 0xFFFFFFFF)
+        buf[mac_lo:mac_lo + 3] = ((mac_low + i) & 0xFFFFFF).to_bytes(3, 'big')
+        if batch is None:
+            sock.send(buf)
+            continue
+        batch.add(buf)
+        if batch.full():
+            batch.send(sock)
+    if batch is not None:
+        batch.send(sock)
+
+
+def _recv_replies(sock, expected, timeout=5):
+    """
+    Collect up to `expected` replies on a non-blocking socket, giving up
+    after `timeout` seconds. Each readiness event drains everything
+    queued: up to 43 datagrams per recvmmsg on Linux, else recvfrom calls.
+    """
+    batch = udp_batch.RecvBatch(43, 2048) if udp_batch.available() else None
+    replies = []
+    deadline = time.monotonic() + timeout
+    
+    with selectors.DefaultSelector() as sel:
+        sel.register(sock, selectors.EVENT_READ)
+        while len(replies) < expected:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not sel.select(remaining):
+                break
+            if batch is not None:
+                while True:
+                    received = batch.recv(sock, socket.MSG_DONTWAIT)
+                    for data, addr in received:
+                        replies.append((bytes(data), addr))
+                    if len(received) < batch.count:
+                        break
+                continue
+            while True:
+                try:
+                    replies.append(sock.recvfrom(2048))
+                except BlockingIOError:
+                    break
+    
+    return replies
+
+
+def send_discover(count=1, rcvbuf=_RCVBUF, sndbuf=_SNDBUF):
+    packet = _DISCOVER_TEMPLATE
     
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        clamped = _set_buffers(sock, rcvbuf, sndbuf)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.settimeout(5)
+        # One destination: connect once so sends skip the per-packet route lookup
+        sock.connect(_BROADCAST_ADDR)
         
-        sock.sendto(packet, ('255.255.255.255', 67))
-        print("✓ Sent DHCP DISCOVER packet")
-        print("  Client MAC: aa:bb:cc:dd:ee:ff")
+        if count == 1:
+            sock.send(packet)
+            print("✓ Sent DHCP DISCOVER packet")
+            print("  Client MAC: aa:bb:cc:dd:ee:ff")
+        else:
+            _send_burst(sock, packet, count)
+            print(f"✓ Sent {count} DHCP DISCOVER packets")
+            print("  Client MACs: aa:bb:cc:dd:ee:ff and up")
         print("  Waiting for OFFER...")
         
         try:
-            client_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            client_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM | _SOCK_NONBLOCK)
+            client_sock.setblocking(False)  # for platforms without SOCK_NONBLOCK
+            clamped |= _set_buffers(client_sock, rcvbuf, sndbuf)
             client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
             client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             client_sock.bind(('', 68))
-            client_sock.settimeout(5)
             
-            response, addr = client_sock.recvfrom(1024)
-            print(f"✓ Received OFFER from {addr}")
-            print(f"  Response length: {len(response)} bytes")
+            replies = _recv_replies(client_sock, count)
+            if not replies:
+                print("⚠ No OFFER received (timeout - server might not be running)")
+            elif count == 1:
+                response, addr = replies[0]
+                print(f"✓ Received OFFER from {addr}")
+                print(f"  Response length: {len(response)} bytes")
+            else:
+                print(f"✓ Received {len(replies)}/{count} replies")
             
             client_sock.close()
-        except socket.timeout:
-            print("⚠ No OFFER received (timeout - server might not be running)")
         except PermissionError:
             print("⚠ Cannot bind to port 68 (need admin privileges)")
             print("  But DISCOVER was sent successfully!")
+        if clamped:
+            _print_buffer_hint(rcvbuf, sndbuf)
         
         sock.close()
         
     except Exception as e:
         print(f"✗ Error: {e}")
 
+def _positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DHCP test client")
+    parser.add_argument('--count', type=_positive_int, default=1,
+                        help="DISCOVERs to send, each with its own xid and MAC (default: 1)")
+    parser.add_argument('--rcvbuf', type=int, default=_RCVBUF,
+                        help=f"SO_RCVBUF size in bytes (default: {_RCVBUF})")
+    parser.add_argument('--sndbuf', type=int, default=_SNDBUF,
+                        help=f"SO_SNDBUF size in bytes (default: {_SNDBUF})")
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("DHCP Test Client")
     print("=" * 50)
     print()
-    send_discover()
+    send_discover(args.count, args.rcvbuf, args.sndbuf)
     print()
     print("Check your DHCP server logs for activity!")
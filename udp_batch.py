@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Batched UDP receive and send via recvmmsg(2) / sendmmsg(2).
+
+Python's socket module exposes neither, so they are called through
+ctypes. Linux only: `available()` is False elsewhere and callers fall back
+to one recvfrom/sendto per datagram.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import socket
+import sys
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ('sin_family', ctypes.c_ushort),
+        ('sin_port', ctypes.c_ubyte * 2),   # network order
+        ('sin_addr', ctypes.c_ubyte * 4),
+        ('sin_zero', ctypes.c_ubyte * 8),
+    ]
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        recvmmsg = libc.recvmmsg
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint,
+                         ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+    # Vector passed as an address so a partial send can resume mid-array
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return libc
+
+
+_libc = _load_libc()
+
+
+def available():
+    """True when recvmmsg/sendmmsg can be used on this platform."""
+    return _libc is not None
+
+
+class RecvBatch:
+    """
+    Preallocated recvmmsg vector: up to `count` datagrams of at most
+    `bufsize` bytes per syscall, received into one contiguous buffer that
+    is reused across calls.
+    """
+
+    def __init__(self, count=32, bufsize=4096):
+        self.count = count
+        self.bufsize = bufsize
+        self._buf = (ctypes.c_char * (count * bufsize))()
+        self._view = memoryview(self._buf).cast('B')
+        self._iov = (_IOVec * count)()
+        self._addrs = (_SockAddrIn * count)()
+        self._msgs = (_MMsgHdr * count)()
+
+        base = ctypes.addressof(self._buf)
+        for i in range(count):
+            self._iov[i].iov_base = base + i * bufsize
+            self._iov[i].iov_len = bufsize
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addrs[i])
+            # Value-result, but always sizeof(sockaddr_in) for AF_INET
+            hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+            hdr.msg_iov = ctypes.cast(ctypes.addressof(self._iov[i]), ctypes.POINTER(_IOVec))
+            hdr.msg_iovlen = 1
+
+    def recv(self, sock, flags=0):
+        """
+        Receive up to `count` datagrams in one syscall.
+
+        Returns a list of (data, (ip, port)); `data` is a memoryview into
+        the batch buffer, valid until the next call. Empty when nothing is
+        queued on a non-blocking receive.
+        """
+        n = _libc.recvmmsg(sock.fileno(), self._msgs, self.count, flags, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, os.strerror(err))
+
+        batch = []
+        for i in range(n):
+            start = i * self.bufsize
+            addr = self._addrs[i]
+            address = (socket.inet_ntoa(bytes(addr.sin_addr)),
+                       int.from_bytes(bytes(addr.sin_port), 'big'))
+            batch.append((self._view[start:start + self._msgs[i].msg_len], address))
+        return batch
+
+
+class SendBatch:
+    """
+    Preallocated sendmmsg vector: up to `count` datagrams of at most
+    `bufsize` bytes, all to one destination. Payloads are copied in by
+    `add`, so callers may reuse their own buffers straight away.
+    With `connected`, no address is passed (the socket's peer is used).
+    """
+
+    def __init__(self, count=32, bufsize=1500, connected=False):
+        self.count = count
+        self.bufsize = bufsize
+        self._pending = 0
+        self._buf = (ctypes.c_char * (count * bufsize))()
+        self._view = memoryview(self._buf).cast('B')
+        self._iov = (_IOVec * count)()
+        self._addr = _SockAddrIn()
+        self._msgs = (_MMsgHdr * count)()
+
+        base = ctypes.addressof(self._buf)
+        for i in range(count):
+            self._iov[i].iov_base = base + i * bufsize
+            hdr = self._msgs[i].msg_hdr
+            if not connected:
+                hdr.msg_name = ctypes.addressof(self._addr)
+                hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+            hdr.msg_iov = ctypes.cast(ctypes.addressof(self._iov[i]), ctypes.POINTER(_IOVec))
+            hdr.msg_iovlen = 1
+
+    def __len__(self):
+        return self._pending
+
+    def full(self):
+        return self._pending == self.count
+
+    def add(self, data, tail=b''):
+        """
+        Queue `data` + `tail` as one datagram. Returns False, queuing
+        nothing, if it does not fit in a slot; the batch must not be full.
+        """
+        size = len(data) + len(tail)
+        if size > self.bufsize:
+            return False
+        start = self._pending * self.bufsize
+        mid = start + len(data)
+        self._view[start:mid] = data
+        self._view[mid:start + size] = tail
+        self._iov[self._pending].iov_len = size
+        self._pending += 1
+        return True
+
+    def send(self, sock, address=None):
+        """
+        Send every queued datagram to `address` (ip, port), or to the
+        connected peer when `address` is None, and empty the batch.
+        """
+        pending, self._pending = self._pending, 0
+        if not pending:
+            return
+        if address is not None:
+            ip, port = address
+            self._addr.sin_family = socket.AF_INET
+            self._addr.sin_port[:] = port.to_bytes(2, 'big')
+            self._addr.sin_addr[:] = socket.inet_aton(ip)
+
+        base = ctypes.addressof(self._msgs)
+        size = ctypes.sizeof(_MMsgHdr)
+        sent = 0
+        while sent < pending:
+            n = _libc.sendmmsg(sock.fileno(), base + sent * size, pending - sent, 0)
+            if n < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    # Non-blocking socket with a full send buffer
+                    select.select([], [sock], [])
+                    continue
+                raise OSError(err, os.strerror(err))
+            sent += n
@@ -3,23 +3,103 @@
 Configuration Validator (updated for multi-subnet)
 """
 
+import hashlib
 import json
 import ipaddress
+import os
+import socket
 import sys
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib json module
+    orjson = None
+
+# Byte class table: 1 = hex digit, 2 = separator, 0 = invalid
+_MAC_CLASS = bytes(1 if c in b'0123456789abcdefABCDEF' else 2 if c in b':-.' else 0
+                   for c in range(256))
 
 def is_valid_mac(mac):
-    mac_clean = mac.replace(':', '').replace('-', '').replace('.', '')
-    if len(mac_clean) != 12: return False
     try:
-        int(mac_clean, 16)
+        classes = mac.encode('ascii').translate(_MAC_CLASS)
+    except UnicodeEncodeError:
+        return False
+    return 0 not in classes and classes.count(1) == 12
+
+def _valid_ipv4(ip):
+    """Strict dotted-quad check, same acceptance as ipaddress.IPv4Address(str)."""
+    try:
+        socket.inet_pton(socket.AF_INET, ip)
         return True
-    except ValueError:
+    except (OSError, TypeError, ValueError):
         return False
 
+def _ip2int(ip):
+    """Dotted-quad -> int in one C call; ValueError where IPv4Address would fail."""
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError, ValueError):
+        raise ValueError(f"Invalid IPv4 address: {ip!r}") from None
+
+@lru_cache(maxsize=8)
+def _load(path, mtime_ns, size):
+    """Parse a config file; (mtime, size) in the key re-parses it once edited."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+# Outcomes of earlier successful runs, so an unchanged config is not re-checked
+_RESULT_CACHE = Path.home() / '.cache' / 'dhcp-server' / 'validate.json'
+_RESULT_CACHE_MAX = 32
+
+def _result_key(path, st):
+    """Path, mtime, size and a hash of the first 4 KB; plus this script's mtime."""
+    with open(path, 'rb') as f:
+        head = hashlib.sha256(f.read(4096)).hexdigest()
+    own = os.stat(__file__).st_mtime_ns
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{head}|{own}"
+
+def _read_results():
+    try:
+        with open(_RESULT_CACHE, 'rb') as f:
+            results = json.loads(f.read())
+        return results if isinstance(results, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _store_result(key, warnings):
+    results = _read_results()
+    results.pop(key, None)
+    results[key] = {'ok': True, 'warnings': warnings}
+    # Oldest entries first (insertion order); keep the file bounded
+    for old in list(results)[:-_RESULT_CACHE_MAX]:
+        del results[old]
+    try:
+        _RESULT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _RESULT_CACHE.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(results, f)
+        os.replace(tmp, _RESULT_CACHE)
+    except OSError:
+        pass  # caching is best effort
+
+def _report(title, items):
+    """Write a titled list in one write() instead of a print per line."""
+    sys.stdout.write(f"{title}\n" + "".join(f" - {item}\n" for item in items))
+
 def validate_config(config_file='config.json'):
     print("Validating configuration...")
-    with open(config_file, 'r') as f:
-        config = json.load(f)
+    st = os.stat(config_file)
+    key = _result_key(config_file, st)
+    cached = _read_results().get(key)
+    if cached and cached.get('ok'):
+        if cached.get('warnings'):
+            _report("WARNINGS:", cached['warnings'])
+        print("Configuration looks valid (cached)")
+        return True
+    config = _load(config_file, st.st_mtime_ns, st.st_size)
 
     errors = []
     warnings = []
@@ -41,8 +121,8 @@ def validate_config(config_file='config.json'):
                     errors.append(f"Invalid network in subnet {s.get('name','')}: {e}")
                 # Validate IP pool
                 try:
-                    start = ipaddress.IPv4Address(s['ip_pool_start'])
-                    end = ipaddress.IPv4Address(s['ip_pool_end'])
+                    start = _ip2int(s['ip_pool_start'])
+                    end = _ip2int(s['ip_pool_end'])
                     if start > end:
                         errors.append(f"ip_pool_start must be <= ip_pool_end in subnet {s.get('name','')}")
                 except Exception as e:
@@ -51,9 +131,7 @@ def validate_config(config_file='config.json'):
                 for mac, ip in s.get('reservations', {}).items():
                     if not is_valid_mac(mac):
                         warnings.append(f"Invalid MAC format in subnet {s.get('name','')}: {mac}")
-                    try:
-                        ipaddress.IPv4Address(ip)
-                    except Exception:
+                    if not _valid_ipv4(ip):
                         errors.append(f"Invalid reserved IP for {mac}: {ip} in subnet {s.get('name','')}")
     else:
         # legacy single-pool checks
@@ -66,20 +144,15 @@ def validate_config(config_file='config.json'):
     for mac, ip in config.get('reservations', {}).items():
         if not is_valid_mac(mac):
             warnings.append(f"Invalid MAC format for global reservation: {mac}")
-        try:
-            ipaddress.IPv4Address(ip)
-        except Exception:
+        if not _valid_ipv4(ip):
             errors.append(f"Invalid IP in global reservation: {mac} -> {ip}")
 
     if errors:
-        print("ERRORS:")
-        for e in errors:
-            print(" -", e)
+        _report("ERRORS:", errors)
         return False
     if warnings:
-        print("WARNINGS:")
-        for w in warnings:
-            print(" -", w)
+        _report("WARNINGS:", warnings)
+    _store_result(key, warnings)
     print("Configuration looks valid")
     return True
 